@@ -7,11 +7,52 @@ import torch
 from simple_parsing.helpers import field
 
 from ..files import ccs_reporter_dir
-from ..metrics import evaluate_preds, get_logprobs
+from ..metrics import (
+    ENSEMBLING_MODES,
+    evaluate_preds_all_modes,
+    get_logprobs_all_modes,
+)
 from ..run import Run
+from ..training import CcsConfig, CcsReporter, Classifier, FitterConfig
+from ..training.classifier import load_classifiers
+from ..training.common import Reporter
 from ..utils import Color
 
 
+def load_reporter(
+    reporter_dir: Path, layer: int, device: str
+) -> CcsReporter | Reporter:
+    """Load the reporter for `layer`, falling back to the old pickled format."""
+    path = reporter_dir / f"layer_{layer}.safetensors"
+    if not path.exists():
+        # Old checkpoints are whole pickled modules which we saved ourselves
+        return torch.load(
+            reporter_dir / f"layer_{layer}.pt", map_location=device, weights_only=False
+        )
+
+    cfg = FitterConfig.load(reporter_dir / "cfg.yaml")
+    if isinstance(cfg, CcsConfig):
+        return CcsReporter.load(path, cfg, device=device)
+    else:
+        return Reporter.load(path, device=device)
+
+
+def load_lr_models(lr_dir: Path, layer: int, device: str) -> list[Classifier]:
+    """Load the supervised probes for `layer`, falling back to the old pickled
+    format."""
+    path = lr_dir / f"layer_{layer}.safetensors"
+    if path.exists():
+        return load_classifiers(path, device)
+
+    with open(lr_dir / f"layer_{layer}.pt", "rb") as f:
+        lr_models = torch.load(f, map_location=device, weights_only=False)
+
+    if not isinstance(lr_models, list):  # backward compatibility
+        lr_models = [lr_models]
+
+    return lr_models
+
+
 @dataclass(kw_only=True)
 class Eval(Run):
     """Full specification of a reporter evaluation run."""
@@ -38,8 +79,15 @@ class Eval(Run):
 
         experiment_dir = ccs_reporter_dir() / self.source
 
-        reporter_path = experiment_dir / "reporters" / f"layer_{layer}.pt"
-        reporter = torch.load(reporter_path, map_location=device)
+        reporter = load_reporter(experiment_dir / "reporters", layer, device)
+
+        lr_dir = experiment_dir / "lr_models"
+        if not self.skip_supervised and lr_dir.exists():
+            lr_models = load_lr_models(lr_dir, layer, device)
+            for model in lr_models:
+                model.eval()
+        else:
+            lr_models = []
 
         out_logprobs = defaultdict(dict)
         row_bufs = defaultdict(list)
@@ -52,67 +100,54 @@ class Eval(Run):
                     texts=val_data.texts,
                     labels=val_data.labels.cpu(),
                     lm=dict(),
-                    lr=dict(),
+                    lr={mode: dict() for mode in ENSEMBLING_MODES} if lr_models else {},
                     reporter=dict(),
                 )
 
             val_credences = reporter(val_data.hiddens)
-            for mode in ("none", "partial", "full"):
+            for mode, result in evaluate_preds_all_modes(
+                val_data.labels, val_credences
+            ).items():
                 row_bufs["eval"].append(
-                    {
-                        **meta,
-                        "ensembling": mode,
-                        **evaluate_preds(
-                            val_data.labels, val_credences, mode
-                        ).to_dict(),
-                    }
+                    {**meta, "ensembling": mode, **result.to_dict()}
                 )
-                if self.save_logprobs:
-                    out_logprobs[ds_name]["reporter"][mode] = (
-                        get_logprobs(val_credences, mode).detach().cpu()
+            if self.save_logprobs:
+                out_logprobs[ds_name]["reporter"] = {
+                    mode: logprobs.cpu()
+                    for mode, logprobs in get_logprobs_all_modes(val_credences).items()
+                }
+
+            if val_data.lm_preds is not None:
+                for mode, result in evaluate_preds_all_modes(
+                    val_data.labels, val_data.lm_preds
+                ).items():
+                    row_bufs["lm_eval"].append(
+                        {**meta, "ensembling": mode, **result.to_dict()}
                     )
+                if self.save_logprobs:
+                    out_logprobs[ds_name]["lm"] = {
+                        mode: logprobs.cpu()
+                        for mode, logprobs in get_logprobs_all_modes(
+                            val_data.lm_preds
+                        ).items()
+                    }
 
-                if val_data.lm_preds is not None:
-                    row_bufs["lm_eval"].append(
+            for i, model in enumerate(lr_models):
+                lr_credences = model(val_data.hiddens)
+                if self.save_logprobs:
+                    for mode, logprobs in get_logprobs_all_modes(lr_credences).items():
+                        out_logprobs[ds_name]["lr"][mode][i] = logprobs.cpu()
+
+                for mode, result in evaluate_preds_all_modes(
+                    val_data.labels, lr_credences
+                ).items():
+                    row_bufs["lr_eval"].append(
                         {
-                            **meta,
                             "ensembling": mode,
-                            **evaluate_preds(
-                                val_data.labels, val_data.lm_preds, mode
-                            ).to_dict(),
+                            "inlp_iter": i,
+                            **meta,
+                            **result.to_dict(),
                         }
                     )
-                    if self.save_logprobs:
-                        out_logprobs[ds_name]["lm"][mode] = get_logprobs(
-                            val_data.lm_preds, mode
-                        ).cpu()
-
-                lr_dir = experiment_dir / "lr_models"
-                if not self.skip_supervised and lr_dir.exists():
-                    with open(lr_dir / f"layer_{layer}.pt", "rb") as f:
-                        lr_models = torch.load(f, map_location=device)
-                        if not isinstance(lr_models, list):  # backward compatibility
-                            lr_models = [lr_models]
-
-                    if self.save_logprobs:
-                        out_logprobs[ds_name]["lr"][mode] = dict()
-
-                    for i, model in enumerate(lr_models):
-                        model.eval()
-                        val_credences = model(val_data.hiddens)
-                        if self.save_logprobs:
-                            out_logprobs[ds_name]["lr"][mode][i] = get_logprobs(
-                                val_credences, mode
-                            ).cpu()
-                        row_bufs["lr_eval"].append(
-                            {
-                                "ensembling": mode,
-                                "inlp_iter": i,
-                                **meta,
-                                **evaluate_preds(
-                                    val_data.labels, val_credences, mode
-                                ).to_dict(),
-                            }
-                        )
 
         return {k: pd.DataFrame(v) for k, v in row_bufs.items()}, out_logprobs
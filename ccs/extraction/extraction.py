@@ -1,13 +1,16 @@
 """Functions for extracting the hidden states of a model."""
 import logging
+import math
 import os
 from contextlib import nullcontext, redirect_stdout
 from dataclasses import InitVar, dataclass, replace
-from itertools import zip_longest
+from functools import lru_cache
+from itertools import islice, zip_longest
 from typing import Any, Iterable, Literal
 from warnings import filterwarnings
 
 import torch
+import torch.nn.functional as F
 from datasets import (
     Array2D,
     Array3D,
@@ -23,7 +26,8 @@ from datasets import (
 )
 from simple_parsing import Serializable, field
 from torch import Tensor
-from transformers import AutoConfig, PreTrainedModel
+from torch.nn.utils.rnn import pad_sequence
+from transformers import AutoConfig, PreTrainedModel, PreTrainedTokenizerBase
 
 from ..promptsource import DatasetTemplates
 from ..utils import (
@@ -68,6 +72,10 @@ class Extract(Serializable):
     int8: bool = False
     """Whether to perform inference in mixed int8 precision with `bitsandbytes`."""
 
+    int4: bool = False
+    """Whether to load the weights in 4-bit NF4 precision with `bitsandbytes`. This
+    quarters the memory used by the weights compared to fp16."""
+
     max_examples: tuple[int, int] = (1000, 1000)
     """Maximum number of examples to use from each split of the dataset."""
 
@@ -101,6 +109,18 @@ class Extract(Serializable):
     """Whether to extract hidden states from the encoder instead of the decoder in the
     case of encoder-decoder models."""
 
+    torch_compile: bool = False
+    """Whether to compile the model with `torch.compile` before extracting. This
+    speeds up long runs on GPU at the cost of some up-front compilation time."""
+
+    sort_window: int = 1
+    """Number of upcoming examples whose prompts are pooled together, sorted by
+    length, and run through the model in batches of similar lengths."""
+
+    max_batch_tokens: int | None = None
+    """Maximum number of tokens, including padding, in a single forward pass. By
+    default, all the prompts in a window are run in one forward pass."""
+
     def __post_init__(self, layer_stride: int):
         if self.num_variants != -1:
             print("WARNING: num_variants is deprecated; use prompt_indices instead.")
@@ -109,6 +129,11 @@ class Extract(Serializable):
                 "Must specify at least one dataset to extract hiddens from."
             )
 
+        if self.int8 and self.int4:
+            raise ValueError("Can't use both int8 and int4 quantization")
+        if self.sort_window < 1:
+            raise ValueError("sort_window must be positive")
+
         if len(self.max_examples) > 2:
             raise ValueError(
                 "max_examples should be a list of length 0, 1, or 2,"
@@ -149,7 +174,6 @@ class Extract(Serializable):
         ]
 
 
-@torch.inference_mode()
 def extract_hiddens(
     cfg: "Extract",
     *,
@@ -159,6 +183,30 @@ def extract_hiddens(
     world_size: int = 1,
 ) -> Iterable[dict]:
     """Run inference on a model with a set of prompts, yielding the hidden states."""
+    try:
+        yield from _extract_hiddens(
+            cfg,
+            device=device,
+            split_type=split_type,
+            rank=rank,
+            world_size=world_size,
+        )
+    finally:
+        # Don't hold onto the model weights once the caller is done with us
+        _load_model.cache_clear()
+
+
+@torch.inference_mode()
+def _extract_hiddens(
+    cfg: "Extract",
+    *,
+    device: str | torch.device,
+    split_type: Literal["train", "val"],
+    rank: int,
+    world_size: int,
+) -> Iterable[dict]:
+    """Implementation of `extract_hiddens`, which leaves the loaded model cached so
+    that `extract()` can reuse it across splits."""
     os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
     # Silence datasets logging messages from all but the first process
@@ -172,7 +220,9 @@ def extract_hiddens(
     # We use contextlib.redirect_stdout to prevent `bitsandbytes` from printing its
     # welcome message on every rank
     with redirect_stdout(None) if rank != 0 else nullcontext():
-        model = instantiate_model(cfg.model, device=device, load_in_8bit=cfg.int8)
+        model = _load_model(
+            cfg.model, torch.device(device), int8=cfg.int8, int4=cfg.int4
+        )
         tokenizer = instantiate_tokenizer(
             cfg.model, truncation_side="left", verbose=rank == 0
         )
@@ -187,6 +237,9 @@ def extract_hiddens(
     if has_lm_preds and rank == 0:
         print("Model has language model head, will store predictions.")
 
+    if cfg.torch_compile:
+        model = torch.compile(model, mode="reduce-overhead", dynamic=True)
+
     prompt_ds = load_prompts(
         ds_names[0],
         binarize=cfg.binarize,
@@ -201,6 +254,8 @@ def extract_hiddens(
 
     layer_indices = cfg.layers or tuple(range(model.config.num_hidden_layers + 1))
 
+    device = torch.device(device)
+
     global_max_examples = cfg.max_examples[0 if split_type == "train" else 1]
 
     # break `max_examples` among the processes roughly equally
@@ -216,143 +271,374 @@ def extract_hiddens(
     if rank == world_size - 1:
         max_examples += global_max_examples % world_size
 
-    for example in prompt_ds:
-        # Check if we've yielded enough examples
-        if num_yielded >= max_examples:
-            break
-
-        num_variants = len(example["prompts"])
-        num_choices = len(example["prompts"][0])
+    # Scratch buffers which are reused across windows. On GPU, hiddens are copied to
+    # a pinned staging buffer on a side stream.
+    copy_stream = torch.cuda.Stream(device) if device.type == "cuda" else None
+    scratch: Tensor | None = None
+    host_buf: Tensor | None = None
+
+    # Maps answer strings to their token ids
+    answer_cache: dict[str, list[int]] = {}
+
+    # When compiling, round the padded lengths up to a small set of buckets so that
+    # we can reuse the compiled graphs across batches
+    pad_multiple = 64 if cfg.torch_compile else 1
+
+    prompt_iter = iter(prompt_ds)
+    while num_yielded < max_examples:
+        # Tokenize a window of upcoming examples, so that we can sort all of their
+        # prompts by length and waste less compute on padding
+        window = []
+        while len(window) < (
+            window_size := min(cfg.sort_window, max_examples - num_yielded)
+        ):
+            examples = list(islice(prompt_iter, window_size - len(window)))
+            if not examples:
+                break
 
-        hidden_dict = {
-            f"hidden_{layer_idx}": torch.empty(
-                num_variants,
-                num_choices,
-                model.config.hidden_size,
-                device=device,
-                dtype=torch.int16,
+            # Flatten the (variant, choice) grid of prompts for each example, and
+            # tokenize all the prompts in the window with a single tokenizer call
+            choices = [
+                [choice for record in example["prompts"] for choice in record]
+                for example in examples
+            ]
+            all_texts = [choice["question"] for chunk in choices for choice in chunk]
+
+            # Keep [CLS] and [SEP] for BERT-style models
+            all_input_ids = tokenizer(all_texts, add_special_tokens=True)["input_ids"]
+
+            # The same few answers are shared by every variant (and usually every
+            # example), so we only tokenize each distinct answer once
+            new_answers = list(
+                {choice["answer"] for chunk in choices for choice in chunk}
+                - answer_cache.keys()
             )
-            for layer_idx in layer_indices
-        }
-        lm_log_odds = torch.empty(
-            num_variants,
-            num_choices,
-            device=device,
-            dtype=torch.float32,
-        )
-        text_questions = []
+            if new_answers and is_enc_dec:
+                encoded = tokenizer(text_target=new_answers)["input_ids"]
+                answer_cache.update(zip(new_answers, encoded))
+            elif new_answers:
+                answer_cache.update(
+                    zip(new_answers, _encode_answers(tokenizer, new_answers))
+                )
 
-        # Iterate over variants
-        for i, record in enumerate(example["prompts"]):
-            variant_questions = []
+            offset = 0
+            for example, chunk in zip(examples, choices):
+                texts = all_texts[offset : offset + len(chunk)]
+                input_ids = all_input_ids[offset : offset + len(chunk)]
+                offset += len(chunk)
 
-            # Iterate over answers
-            for j, choice in enumerate(record):
-                text = choice["question"]
+                answers = [answer_cache[choice["answer"]] for choice in chunk]
 
                 # Only feed question, not the answer, to the encoder for enc-dec models
-                target = choice["answer"] if is_enc_dec else None
-                encoding = tokenizer(
-                    text,
-                    # Keep [CLS] and [SEP] for BERT-style models
-                    add_special_tokens=True,
-                    return_tensors="pt",
-                    text_target=target,  # type: ignore[arg-type]
-                ).to(device)
-
-                ids = assert_type(Tensor, encoding.input_ids)
+                if not is_enc_dec:
+                    input_ids = [ids + ans for ids, ans in zip(input_ids, answers)]
+
+                # If any of the inputs is too long, skip this example
+                if max(map(len, input_ids)) > max_length:
+                    continue
+
+                window.append((example, texts, input_ids, answers))
+
+        if not window:
+            break
+
+        row_inputs = [ids for _, _, input_ids, _ in window for ids in input_ids]
+        row_answers = [ans for _, _, _, answers in window for ans in answers]
+
+        # Gather the hiddens of every layer into a reusable fp16 scratch buffer, so
+        # that we can quantize them all at once and only check for non-finite
+        # values (which forces a device sync) once per window
+        stacked: Tensor | None = None
+        if has_lm_preds:
+            window_lm_log_odds = torch.empty(len(row_inputs), device=device)
+
+        for batch in _length_sorted_batches(
+            list(map(len, row_inputs)), cfg.max_batch_tokens
+        ):
+            ids, attention_mask = _pad(
+                [torch.tensor(row_inputs[i]) for i in batch],
+                device,
+                pad_multiple,
+                max_length,
+            )
+            answer_ids, answer_mask = _pad(
+                [torch.tensor(row_answers[i]) for i in batch], device, pad_multiple
+            )
+            batch_idx = _to_device(torch.tensor(batch), device)
+
+            inputs = dict(input_ids=ids, attention_mask=attention_mask.long())
+            if is_enc_dec:
+                # Pass the shifted answer directly rather than as `labels`, so that
+                # the model doesn't compute a loss we never use. -100 is the mask
+                # token, which gets replaced with padding.
+                labels = answer_ids.masked_fill(~answer_mask, -100)
+                decoder_ids = model.prepare_decoder_input_ids_from_labels(labels=labels)
+                inputs.update(
+                    decoder_input_ids=decoder_ids,
+                    decoder_attention_mask=answer_mask.long(),
+                )
+            outputs = model(
+                **inputs, output_attentions=False, output_hidden_states=True
+            )
+
+            # Compute the log probability of the answer tokens if available
+            if has_lm_preds:
+                logits = outputs.logits
+                num_rows, max_answer_len = answer_ids.shape
+                answer_lens = answer_mask.sum(dim=-1)
+
+                # Index of the logit predicting the first answer token in each row.
+                # The decoder of an enc-dec model only ever sees the answer, whereas
+                # for decoder-only models the answer comes right after the question.
                 if is_enc_dec:
-                    answer = labels = assert_type(Tensor, encoding.labels)
-                else:
-                    a_id = tokenizer.encode(" " + choice["answer"], add_special_tokens=False)
-
-                    # the Llama tokenizer splits off leading spaces
-                    if tokenizer.decode(a_id[0]).strip() == "":
-                        a_id_without_space = tokenizer.encode(
-                            choice, add_special_tokens=False
-                        )
-                        assert a_id_without_space == a_id[1:]
-                        a_id = a_id_without_space
-
-                    answer = torch.tensor([a_id], device=device)
-                    labels = (
-                        # -100 is the mask token
-                        torch.cat([torch.full_like(ids, -100), answer], dim=-1)
-                        if has_lm_preds
-                        else None
-                    )
-                    ids = torch.cat([ids, answer], -1)
-
-                # If this input is too long, skip it
-                if ids.shape[-1] > max_length:
-                    break
+                    starts = answer_lens.new_zeros(num_rows)
                 else:
-                    # Record the EXACT question we fed to the model
-                    variant_questions.append(text)
-
-                inputs: dict[str, Tensor | None] = dict(input_ids=ids.long())
-                if is_enc_dec or has_lm_preds:
-                    inputs["labels"] = labels
-                outputs = model(**inputs, output_hidden_states=True)
-
-                # Compute the log probability of the answer tokens if available
-                if has_lm_preds:
-                    logprob = -assert_type(Tensor, outputs.loss).to(torch.float32)
-                    # Convert logprob to logodds to be consistent with reporters
-                    # Because we went through logprobs, logodds corresponding to
-                    # probs near 1 will be somewhat imprecise
-                    # log(p/(1-p)) = log(p) - log(1-p) = logp - log(1 - exp(logp))
-                    lm_log_odds[i, j] = logprob - torch.log1p(-logprob.exp())
-                    
-                hiddens = (
-                    outputs.get("decoder_hidden_states") or outputs["hidden_states"]
+                    starts = attention_mask.sum(dim=-1) - answer_lens - 1
+
+                positions = starts[:, None] + torch.arange(
+                    max_answer_len, device=device
+                )
+                positions = positions.masked_fill(~answer_mask, 0)
+                answer_logits = logits.gather(
+                    1, positions[..., None].expand(-1, -1, logits.shape[-1])
+                )
+                # We only need the logprobs of the answer tokens, so instead of taking
+                # a full log-softmax over the vocabulary we subtract the logsumexp
+                # from the answer token logits. The logits stay in the model's native
+                # dtype, but the reduction is accumulated in fp32 to avoid precision
+                # issues.
+                token_logits = answer_logits.gather(-1, answer_ids[..., None]).squeeze(
+                    -1
+                )
+                maxes = answer_logits.amax(dim=-1, keepdim=True)
+                sum_exp = (answer_logits - maxes).exp().sum(dim=-1, dtype=torch.float32)
+                log_normalizer = sum_exp.log() + maxes.squeeze(-1)
+                tokenwise_logprobs = token_logits.float() - log_normalizer
+
+                # Average over the answer tokens, ignoring the padding
+                logprob = (tokenwise_logprobs * answer_mask).sum(-1) / answer_lens
+
+                # Convert logprob to logodds to be consistent with reporters
+                # Because we went through logprobs, logodds corresponding to
+                # probs near 1 will be somewhat imprecise
+                # log(p/(1-p)) = log(p) - log(1-p) = logp - log(1 - exp(logp))
+                window_lm_log_odds[batch_idx] = logprob - torch.log1p(-logprob.exp())
+
+            hiddens = outputs.get("decoder_hidden_states") or outputs["hidden_states"]
+
+            # The decoder hiddens of enc-dec models are over the answer tokens
+            hidden_mask = answer_mask if is_enc_dec else attention_mask
+            lengths = hidden_mask.sum(dim=-1)
+
+            if stacked is None:
+                hidden_shape = (
+                    len(layer_indices),
+                    len(row_inputs),
+                    hiddens[0].shape[-1],
+                )
+                scratch, stacked = _reuse_or_grow(
+                    scratch, hidden_shape, dtype=torch.float16, device=device
                 )
-                # Throw out layers we don't care about
-                hiddens = [hiddens[i] for i in layer_indices]
+            for layer_idx, dest in zip(layer_indices, stacked):
+                # Current shape of each element: (num_rows, seq_len, hidden_size)
+                h = hiddens[layer_idx]
 
-                # Current shape of each element: (batch_size, seq_len, hidden_size)
                 if cfg.token_loc == "first":
-                    hiddens = [h[..., 0, :] for h in hiddens]
+                    h = h[:, 0]
                 elif cfg.token_loc == "last":
-                    hiddens = [h[..., -1, :] for h in hiddens]
+                    # Inputs are right-padded, so we need the last non-padding position
+                    h = h[torch.arange(len(h), device=device), lengths - 1]
                 elif cfg.token_loc == "mean":
-                    hiddens = [h.mean(dim=-2) for h in hiddens]
+                    h = (h * hidden_mask[..., None]).sum(dim=1) / lengths[:, None]
                 else:
                     raise ValueError(f"Invalid token_loc: {cfg.token_loc}")
 
-                for layer_idx, hidden in zip(layer_indices, hiddens):
-                    hidden_dict[f"hidden_{layer_idx}"][i, j] = float_to_int16(hidden)
+                # Scatter the rows back to their original order
+                dest.index_copy_(0, batch_idx, h.to(dest.dtype))
 
-            # We skipped a pseudolabel because it was too long; break out of this whole
-            # example and move on to the next one
-            if len(variant_questions) != num_choices:
-                break
-
-            # Usual case: we have the expected number of pseudolabels
-            text_questions.append(variant_questions)
+        stacked = float_to_int16(assert_type(Tensor, stacked))
 
-        # We skipped a variant because it was too long; move on to the next example
-        if len(text_questions) != num_variants:
-            continue
+        # Copy the whole window to the host at once and hand the raw int16 buffers to
+        # the Arrow writer, instead of having `datasets` convert each layer's tensor
+        if copy_stream is not None:
+            host_buf, host_hiddens = _reuse_or_grow(
+                host_buf, stacked.shape, dtype=torch.int16, pin_memory=True
+            )
+            copy_stream.wait_stream(torch.cuda.current_stream(device))
+            with torch.cuda.stream(copy_stream):
+                host_hiddens.copy_(stacked, non_blocking=True)
+                copy_done = copy_stream.record_event()
+        else:
+            host_hiddens = stacked
 
-        out_record: dict[str, Any] = dict(
-            row_id=example["row_id"],
-            label=example["label"],
-            variant_ids=example["template_names"],
-            texts=text_questions,
-            **hidden_dict,
-        )
         if has_lm_preds:
-            out_record["lm_log_odds"] = lm_log_odds
+            lm_log_odds = window_lm_log_odds.cpu().numpy()
+
+        # Wait for the copy to land before reading the staging buffer
+        if copy_stream is not None:
+            copy_done.synchronize()
+        host_hiddens = host_hiddens.numpy()
+
+        offset = 0
+        for example, texts, _, _ in window:
+            num_variants = len(example["prompts"])
+            num_choices = len(example["prompts"][0])
+            rows = slice(offset, offset + len(texts))
+            offset += len(texts)
+
+            out_record: dict[str, Any] = dict(
+                row_id=example["row_id"],
+                label=example["label"],
+                variant_ids=example["template_names"],
+                # Record the EXACT questions we fed to the model
+                texts=[
+                    texts[i : i + num_choices]
+                    for i in range(0, len(texts), num_choices)
+                ],
+            )
+            if has_lm_preds:
+                out_record["lm_log_odds"] = lm_log_odds[rows].reshape(
+                    num_variants, num_choices
+                )
 
-        assert out_record["variant_ids"] == sorted(out_record["variant_ids"])
-        num_yielded += 1
-        yield out_record
+            # Copy out of the scratch buffers since they'll be overwritten by the
+            # next window
+            out_record.update(
+                (
+                    f"hidden_{layer_idx}",
+                    layer_hidden[rows].reshape(num_variants, num_choices, -1).copy(),
+                )
+                for layer_idx, layer_hidden in zip(layer_indices, host_hiddens)
+            )
+
+            assert out_record["variant_ids"] == sorted(out_record["variant_ids"])
+            num_yielded += 1
+            yield out_record
+
+
+def _encode_answers(
+    tokenizer: PreTrainedTokenizerBase, answers: list[str]
+) -> list[list[int]]:
+    """Tokenize answers so that they can be appended to the end of a prompt."""
+    encoded = tokenizer([" " + answer for answer in answers], add_special_tokens=False)
+    a_ids: list[list[int]] = encoded["input_ids"]
+
+    # the Llama tokenizer splits off leading spaces
+    split_space = [
+        i for i, a_id in enumerate(a_ids) if not tokenizer.decode(a_id[0]).strip()
+    ]
+    if split_space:
+        without_space = tokenizer(
+            [answers[i] for i in split_space], add_special_tokens=False
+        )["input_ids"]
+        for i, a_id_without_space in zip(split_space, without_space):
+            assert a_id_without_space == a_ids[i][1:]
+            a_ids[i] = a_id_without_space
+
+    return a_ids
+
+
+def _length_sorted_batches(
+    lengths: list[int], max_tokens: int | None = None
+) -> list[list[int]]:
+    """Group row indices into batches of rows with similar lengths.
+
+    Rows are sorted by length and greedily packed so that each batch's padded size
+    (number of rows times the longest row) is at most `max_tokens`. A row which is
+    longer than `max_tokens` on its own gets a batch to itself. If `max_tokens` is
+    `None`, all the rows go into a single batch.
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    if max_tokens is None:
+        return [order]
+
+    batches, batch = [], []
+    for i in order:
+        # Rows are sorted, so the current row is the longest one in the batch
+        if batch and (len(batch) + 1) * lengths[i] > max_tokens:
+            batches.append(batch)
+            batch = []
+
+        batch.append(i)
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def _reuse_or_grow(
+    buf: Tensor | None,
+    shape: tuple[int, ...] | torch.Size,
+    **kwargs,
+) -> tuple[Tensor, Tensor]:
+    """Get a contiguous view of a flat scratch buffer with the given shape.
+
+    The buffer is only reallocated, using `kwargs` for `torch.empty`, if it's too
+    small. Returns the (possibly new) buffer along with the view.
+    """
+    numel = math.prod(shape)
+    if buf is None or buf.numel() < numel:
+        buf = torch.empty(numel, **kwargs)
+
+    return buf, buf[:numel].view(shape)
+
+
+def _pad(
+    seqs: list[Tensor],
+    device: torch.device,
+    multiple_of: int = 1,
+    max_length: int | None = None,
+) -> tuple[Tensor, Tensor]:
+    """Right-pad a list of 1D tensors, returning the batch and its padding mask.
+
+    The padded length is rounded up to a multiple of `multiple_of`, but never past
+    `max_length` unless the longest sequence is itself longer than that. The batch
+    is built on the CPU and then copied to `device` with `_to_device`.
+    """
+    lengths = torch.tensor([len(seq) for seq in seqs])
+    padded = pad_sequence(seqs, batch_first=True)
+
+    longest = padded.shape[-1]
+    target_len = -(-longest // multiple_of) * multiple_of
+    if max_length is not None:
+        target_len = max(min(target_len, max_length), longest)
+    padded = F.pad(padded, (0, target_len - longest))
+
+    mask = torch.arange(target_len) < lengths[:, None]
+    return _to_device(padded, device), _to_device(mask, device)
+
+
+def _to_device(x: Tensor, device: torch.device) -> Tensor:
+    """Copy a CPU tensor to `device`, without blocking the host if it's a GPU.
+
+    Pinned buffers come from PyTorch's caching host allocator, so pinning small
+    tensors like these over and over is cheap after the first few batches.
+    """
+    if device.type != "cuda":
+        return x.to(device)
+
+    return x.pin_memory().to(device, non_blocking=True)
+
+
+@lru_cache(maxsize=1)
+def _load_model(
+    model_str: str, device: torch.device, int8: bool, int4: bool
+) -> PreTrainedModel:
+    """Load a model, reusing the last one loaded in this process if possible.
+
+    When extracting on a single device, all splits are generated in the main
+    process, so this saves us from loading the weights once per split.
+    """
+    return instantiate_model(
+        model_str, device=device, load_in_8bit=int8, load_in_4bit=int4
+    )
 
 
-# Dataset.from_generator wraps all the arguments in lists, so we unpack them here
+# Dataset.from_generator wraps all the arguments in lists, so we unpack them here.
+# The model cache is cleared by `extract()` once all the splits are done.
 def _extraction_worker(**kwargs):
-    yield from extract_hiddens(**{k: v[0] for k, v in kwargs.items()})
+    yield from _extract_hiddens(**{k: v[0] for k, v in kwargs.items()})
 
 
 def hidden_features(cfg: Extract) -> tuple[DatasetInfo, Features]:
@@ -475,12 +761,19 @@ def extract(
     mp.set_start_method("spawn", force=True)  # type: ignore[attr-defined]
 
     ds = dict()
-    for split, builder in builders.items():
-        builder.download_and_prepare(
-            download_mode=DownloadMode.FORCE_REDOWNLOAD if disable_cache else None,
-            num_proc=len(devices),
-        )
-        ds[split] = builder.as_dataset(split=split)
+    try:
+        for split, builder in builders.items():
+            # Each worker process owns one device and writes its own Arrow shard
+            # directly, so hidden states never have to be sent back to this process
+            # or gathered onto a single rank before being written.
+            builder.download_and_prepare(
+                download_mode=DownloadMode.FORCE_REDOWNLOAD if disable_cache else None,
+                num_proc=len(devices),
+            )
+            ds[split] = builder.as_dataset(split=split)
+    finally:
+        # Don't hold onto the model weights once we're done extracting
+        _load_model.cache_clear()
 
     dataset_dict = DatasetDict(ds)
     return DatasetDictWithName(
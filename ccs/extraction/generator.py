@@ -1,5 +1,5 @@
 from copy import deepcopy
-from dataclasses import dataclass, field
+from dataclasses import MISSING, dataclass, field, fields
 from typing import Any, Callable
 
 from datasets import (
@@ -11,6 +11,10 @@ from datasets import (
 )
 from datasets.splits import NamedSplit
 
+# Fields of the `Extract` config which only change how the hidden states are computed,
+# not their values, so they shouldn't invalidate the cache
+_EXECUTION_ONLY_FIELDS = ("max_batch_tokens", "sort_window", "torch_compile")
+
 
 @dataclass
 class _GeneratorConfig(BuilderConfig):
@@ -32,6 +36,12 @@ class _GeneratorConfig(BuilderConfig):
             for k, v in config_kwargs.get("gen_kwargs", {}).items()
             if k not in ("device", "rank", "world_size")
         }
+        cfg = config_kwargs["gen_kwargs"].get("cfg")
+        if cfg is not None:
+            for f in fields(cfg):
+                if f.name in _EXECUTION_ONLY_FIELDS and f.default is not MISSING:
+                    setattr(cfg, f.name, f.default)
+
         return super().create_config_id(config_kwargs, custom_features)
 
 
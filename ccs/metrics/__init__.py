@@ -1,15 +1,26 @@
 from .accuracy import accuracy_ci
 from .calibration import CalibrationError, CalibrationEstimate
-from .eval import EvalResult, evaluate_preds, get_logprobs, to_one_hot
+from .eval import (
+    ENSEMBLING_MODES,
+    EvalResult,
+    evaluate_preds,
+    evaluate_preds_all_modes,
+    get_logprobs,
+    get_logprobs_all_modes,
+    to_one_hot,
+)
 from .roc_auc import RocAucResult, roc_auc, roc_auc_ci
 
 __all__ = [
     "accuracy_ci",
+    "ENSEMBLING_MODES",
     "CalibrationError",
     "CalibrationEstimate",
     "EvalResult",
     "evaluate_preds",
+    "evaluate_preds_all_modes",
     "get_logprobs",
+    "get_logprobs_all_modes",
     "roc_auc",
     "roc_auc_ci",
     "to_one_hot",
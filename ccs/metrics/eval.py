@@ -50,6 +50,14 @@ class EvalResult:
         }
 
 
+ENSEMBLING_MODES: tuple[Literal["none", "partial", "full"], ...] = (
+    "none",
+    "partial",
+    "full",
+)
+"""All the ways of ensembling predictions across prompt variants."""
+
+
 def get_logprobs(
     y_logits: Tensor, ensembling: Literal["none", "partial", "full"] = "none"
 ) -> Tensor:
@@ -73,6 +81,29 @@ def get_logprobs(
     return F.logsigmoid(y_logits)
 
 
+def get_logprobs_all_modes(y_logits: Tensor) -> dict[str, Tensor]:
+    """
+    Get the class probabilities from a tensor of logits for every ensembling mode.
+
+    This is equivalent to calling `get_logprobs` once per mode, but computes the
+    pooled logits shared by the "partial" and "full" modes only once.
+
+    Args:
+        y_logits: Predicted log-odds of the positive class, tensor of shape (n, v, c).
+    Returns:
+        Dict mapping each ensembling mode to its tensor of logprobs, as returned by
+            `get_logprobs`.
+    """
+    assert y_logits.shape[-1] == 2, "Logits must be binary."
+    pooled_logits = y_logits[..., 1] - y_logits[..., 0]
+
+    return {
+        "none": F.logsigmoid(y_logits[..., 1]),
+        "partial": F.logsigmoid(pooled_logits),
+        "full": F.logsigmoid(pooled_logits.mean(dim=1)),
+    }
+
+
 def evaluate_preds(
     y_true: Tensor,
     y_logits: Tensor,
@@ -96,6 +127,68 @@ def evaluate_preds(
     else:
         y_true = repeat(y_true, "n -> n v", v=v)
 
+    pooled_logits = None
+    if c == 2:
+        pooled_logits = (
+            y_logits[..., 1]
+            if ensembling == "none"
+            else y_logits[..., 1] - y_logits[..., 0]
+        )
+
+    return _evaluate_ensembled(y_true, y_logits, pooled_logits, ensembling)
+
+
+def evaluate_preds_all_modes(y_true: Tensor, y_logits: Tensor) -> dict[str, EvalResult]:
+    """
+    Evaluate the performance of a classification model under every ensembling mode.
+
+    This is equivalent to calling `evaluate_preds` once per mode, but the per-variant
+    labels shared by "none" and "partial", and the pooled logits used for both the
+    AUROC and the calibration metrics, are only computed once.
+
+    Args:
+        y_true: Ground truth tensor of shape (N,).
+        y_logits: Predicted class tensor of shape (N, variants, n_classes).
+
+    Returns:
+        dict: A dictionary mapping each ensembling mode to its `EvalResult`.
+    """
+    (n, v, c) = y_logits.shape
+    assert y_true.shape == (n,)
+
+    y_true_per_variant = repeat(y_true, "n -> n v", v=v)
+    full_logits = y_logits.mean(dim=1)
+
+    if c == 2:
+        none_pooled = y_logits[..., 1]
+        partial_pooled = y_logits[..., 1] - y_logits[..., 0]
+        full_pooled = full_logits[..., 1] - full_logits[..., 0]
+    else:
+        none_pooled = partial_pooled = full_pooled = None
+
+    return {
+        "none": _evaluate_ensembled(y_true_per_variant, y_logits, none_pooled, "none"),
+        "partial": _evaluate_ensembled(
+            y_true_per_variant, y_logits, partial_pooled, "partial"
+        ),
+        "full": _evaluate_ensembled(y_true, full_logits, full_pooled, "full"),
+    }
+
+
+def _evaluate_ensembled(
+    y_true: Tensor,
+    y_logits: Tensor,
+    pooled_logits: Tensor | None,
+    ensembling: Literal["none", "partial", "full"],
+) -> EvalResult:
+    """Compute the metrics for labels and logits that are already ensembled.
+
+    `y_true` has shape (N,) for "full" and (N, variants) otherwise, matching the
+    leading dimensions of `y_logits`. `pooled_logits` holds the log-odds of the
+    positive class for binary tasks, and is `None` for multi-class tasks.
+    """
+    c = y_logits.shape[-1]
+
     THRESHOLD = 0.5
     if ensembling == "none":
         y_pred = y_logits[..., 1].gt(THRESHOLD).to(torch.int)
@@ -108,8 +201,8 @@ def evaluate_preds(
         auroc = roc_auc_ci(to_one_hot(y_true, c).long().flatten(1), y_logits.flatten(1))
     elif ensembling in ("partial", "full"):
         # Pool together the negative and positive class logits
-        if c == 2:
-            auroc = roc_auc_ci(y_true, y_logits[..., 1] - y_logits[..., 0])
+        if pooled_logits is not None:
+            auroc = roc_auc_ci(y_true, pooled_logits)
         else:
             auroc = roc_auc_ci(to_one_hot(y_true, c).long(), y_logits)
     else:
@@ -119,12 +212,7 @@ def evaluate_preds(
     cal_err = None
     cal_thresh = None
 
-    if c == 2:
-        pooled_logits = (
-            y_logits[..., 1]
-            if ensembling == "none"
-            else y_logits[..., 1] - y_logits[..., 0]
-        )
+    if pooled_logits is not None:
         pos_probs = torch.sigmoid(pooled_logits)
 
         # Calibrated accuracy
@@ -2,6 +2,7 @@ import os
 import random
 from abc import ABC, abstractmethod
 from collections import defaultdict
+from contextlib import nullcontext
 from dataclasses import dataclass
 from functools import partial
 from pathlib import Path
@@ -30,6 +31,19 @@ from .utils import (
     select_usable_devices,
 )
 
+# The function applied to each layer, set once per pool worker by `_init_worker`
+_worker_func: Callable[[int], tuple[dict[str, pd.DataFrame], dict]] | None = None
+
+
+def _init_worker(func: Callable[[int], tuple[dict[str, pd.DataFrame], dict]]):
+    global _worker_func
+    _worker_func = func
+
+
+def _call_worker(layer: int) -> tuple[dict[str, pd.DataFrame], dict]:
+    assert _worker_func is not None, "Worker was not initialized"
+    return _worker_func(layer)
+
 
 @dataclass
 class LayerData:
@@ -211,16 +225,24 @@ class Run(ABC, Serializable):
         if self.concatenated_layer_offset > 0:
             layers = self.concatenate(layers)
 
+        # With a single device we run everything in this process, so don't pay for
+        # spawning a worker which would never be used. Otherwise `func` is sent to
+        # each worker once when it starts, rather than pickled along with every
+        # layer, since it holds a reference to the whole run and its datasets.
         ctx = mp.get_context("spawn")
-        with ctx.Pool(num_devices) as pool:
-            mapper = pool.imap_unordered if num_devices > 1 else map
+        if num_devices > 1:
+            pool = ctx.Pool(num_devices, initializer=_init_worker, initargs=(func,))
+            mapper = partial(pool.imap_unordered, _call_worker)
+        else:
+            pool = nullcontext()
+            mapper = partial(map, func)
+
+        with pool:
             df_buffers = defaultdict(list)
             logprobs_dicts = defaultdict(dict)
 
             try:
-                for df_dict, logprobs_dict in tqdm(
-                    mapper(func, layers), total=len(layers)
-                ):
+                for df_dict, logprobs_dict in tqdm(mapper(layers), total=len(layers)):
                     # get arbitrary value
                     df_ = next(iter(df_dict.values()))
                     layer = df_["layer"].iloc[0]
@@ -33,4 +33,10 @@ class BurnsNorm(nn.Module):
 
             avg_norm = std.mean(dim=dims, keepdim=True)
 
-            return x_normalized / avg_norm
+            # Divide in place if we already own a fresh copy of the input, to avoid
+            # allocating and writing out another tensor the size of `x`. We can't do
+            # this when autograd needs the centered input to differentiate the norm.
+            if num_elements > 1 and not x_normalized.requires_grad:
+                return x_normalized.div_(avg_norm)
+            else:
+                return x_normalized / avg_norm
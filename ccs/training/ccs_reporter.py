@@ -3,18 +3,21 @@
 import math
 from copy import deepcopy
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Literal, Optional, cast
 
 import torch
 import torch.nn as nn
-from concept_erasure import LeaceFitter
+from concept_erasure import LeaceEraser, LeaceFitter
+from safetensors import safe_open
+from safetensors.torch import save_file
 from torch import Tensor
 from typing_extensions import override
 
 from ..parsing import parse_loss
 from ..utils.typing import assert_type
 from .burns_norm import BurnsNorm
-from .common import FitterConfig
+from .common import FitterConfig, eraser_from_state_dict, eraser_state_dict
 from .losses import LOSSES
 from .platt_scaling import PlattMixin
 
@@ -172,6 +175,56 @@ class CcsReporter(nn.Module, PlattMixin):
         elif self.config.init != "pca":
             raise ValueError(f"Unknown init: {self.config.init}")
 
+    def save(self, path: Path | str) -> None:
+        """Save the reporter's tensors to a safetensors file.
+
+        The config isn't saved, so it has to be passed to `load()` separately.
+        """
+        assert self.norm is not None, "Must call fit() before save()"
+
+        # Clone to break up any parameters which share storage, like those created
+        # by the spherical init, since safetensors refuses to save them
+        state = {k: v.clone() for k, v in self.state_dict().items()}
+        if isinstance(self.norm, LeaceEraser):
+            state.update(eraser_state_dict(self.norm, prefix="norm."))
+
+        metadata = {
+            "in_features": str(self.in_features),
+            "num_variants": str(self.num_variants),
+        }
+        save_file(state, path, metadata=metadata)
+
+    @classmethod
+    def load(
+        cls,
+        path: Path | str,
+        cfg: CcsConfig,
+        *,
+        device: str | torch.device = "cpu",
+    ) -> "CcsReporter":
+        """Load a reporter saved with `save()`."""
+        with safe_open(path, framework="pt", device=str(device)) as f:
+            metadata = f.metadata()
+            state = {key: f.get_tensor(key) for key in f.keys()}
+
+        reporter = cls(
+            cfg,
+            int(metadata["in_features"]),
+            device=device,
+            num_variants=int(metadata["num_variants"]),
+        )
+        if cfg.norm == "burns":
+            reporter.norm = BurnsNorm()
+        elif cfg.norm == "meanonly":
+            reporter.norm = BurnsNorm(scale=False)
+        else:
+            reporter.norm = eraser_from_state_dict(state, prefix="norm.")
+
+        reporter.load_state_dict(
+            {k: v for k, v in state.items() if not k.startswith("norm.")}
+        )
+        return reporter
+
     def forward(self, x: Tensor) -> Tensor:
         """Return the credence assigned to the hidden state `x`."""
         assert self.norm is not None, "Must call fit() before forward()"
@@ -1,6 +1,8 @@
 from dataclasses import dataclass, field
+from pathlib import Path
 
 import torch
+from safetensors.torch import load_file, save_file
 from torch import Tensor
 from torch.nn.functional import (
     binary_cross_entropy_with_logits as bce_with_logits,
@@ -236,5 +238,40 @@ class Classifier(torch.nn.Module):
 
         # https://en.wikipedia.org/wiki/Projection_(linear_algebra)
         A = self.linear.weight.data.T
-        P = A @ torch.linalg.solve(A.mT @ A, A.mT)
-        return x - x @ P
+
+        # A only has one column per class, so we never form the d x d projection
+        # matrix A (A^T A)^-1 A^T and instead multiply by its low-rank factors
+        return x - (x @ A) @ torch.linalg.solve(A.mT @ A, A.mT)
+
+
+def save_classifiers(classifiers: list[Classifier], path: Path | str) -> None:
+    """Save a list of same-shaped classifiers to one safetensors file by stacking
+    their weights and biases along a new leading dimension."""
+    save_file(
+        {
+            "weight": torch.stack([clf.linear.weight.data for clf in classifiers]),
+            "bias": torch.stack([clf.linear.bias.data for clf in classifiers]),
+        },
+        path,
+    )
+
+
+def load_classifiers(
+    path: Path | str, device: str | torch.device = "cpu"
+) -> list[Classifier]:
+    """Load a list of classifiers saved with `save_classifiers`."""
+    state = load_file(path, device=str(device))
+    weights, biases = state["weight"], state["bias"]
+
+    # Binary classifiers only have a single output
+    out_features, in_features = weights.shape[1:]
+    num_classes = max(out_features, 2)
+
+    classifiers = []
+    for weight, bias in zip(weights, biases):
+        clf = Classifier(in_features, num_classes, device=device, dtype=weight.dtype)
+        clf.linear.weight.data = weight
+        clf.linear.bias.data = bias
+        classifiers.append(clf)
+
+    return classifiers
@@ -1,8 +1,12 @@
 """An ELK reporter network."""
 
 from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
 
+import torch
 from concept_erasure import LeaceEraser
+from safetensors.torch import load_file, save_file
 from simple_parsing.helpers import Serializable
 from torch import Tensor, nn
 
@@ -25,7 +29,71 @@ class Reporter(PlattMixin):
         self.bias = nn.Parameter(self.weight.new_zeros(1))
         self.scale = nn.Parameter(self.weight.new_ones(1))
 
+    @cached_property
+    def _fused_affine(self) -> tuple[Tensor, Tensor]:
+        """Weight and bias of the composition of the eraser and the linear map.
+
+        The eraser is affine and neither it nor the weight change after fitting, so
+        we fold them together once instead of erasing every input we're called on.
+        """
+        proj_left, proj_right = self.eraser.proj_left, self.eraser.proj_right
+        weight_left = self.weight @ proj_left
+
+        weight = self.weight - weight_left @ proj_right
+        if self.eraser.bias is not None:
+            bias = weight_left @ (proj_right @ self.eraser.bias)
+        else:
+            bias = self.weight.new_zeros(len(self.weight))
+
+        return weight, bias
+
     def __call__(self, hiddens: Tensor) -> Tensor:
         """Return the predicted log odds on input `x`."""
-        raw_scores = self.eraser(hiddens) @ self.weight.mT
+        weight, bias = self._fused_affine
+        raw_scores = torch.addmm(bias, hiddens.flatten(0, -2), weight.mT)
+        raw_scores = raw_scores.unflatten(0, hiddens.shape[:-1])
         return raw_scores.mul(self.scale).add(self.bias).squeeze(-1)
+
+    def save(self, path: Path | str) -> None:
+        """Save the reporter's tensors to a safetensors file."""
+        save_file(
+            {
+                "weight": self.weight.contiguous(),
+                "bias": self.bias.data,
+                "scale": self.scale.data,
+                **eraser_state_dict(self.eraser, prefix="eraser."),
+            },
+            path,
+        )
+
+    @classmethod
+    def load(
+        cls, path: Path | str, *, device: str | torch.device = "cpu"
+    ) -> "Reporter":
+        """Load a reporter saved with `save()`."""
+        state = load_file(path, device=str(device))
+        reporter = cls(state["weight"], eraser_from_state_dict(state, "eraser."))
+        reporter.bias.data = state["bias"]
+        reporter.scale.data = state["scale"]
+        return reporter
+
+
+def eraser_state_dict(eraser: LeaceEraser, prefix: str = "") -> dict[str, Tensor]:
+    """Get the tensors of a `LeaceEraser` in a form that safetensors can save."""
+    state = {
+        f"{prefix}proj_left": eraser.proj_left.contiguous(),
+        f"{prefix}proj_right": eraser.proj_right.contiguous(),
+    }
+    if eraser.bias is not None:
+        state[f"{prefix}bias"] = eraser.bias.contiguous()
+
+    return state
+
+
+def eraser_from_state_dict(state: dict[str, Tensor], prefix: str = "") -> LeaceEraser:
+    """Inverse of `eraser_state_dict`."""
+    return LeaceEraser(
+        proj_left=state[f"{prefix}proj_left"],
+        proj_right=state[f"{prefix}proj_right"],
+        bias=state.get(f"{prefix}bias"),
+    )
@@ -1,22 +1,29 @@
 """Main training loop."""
 
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Literal
 
 import pandas as pd
 import torch
-from einops import rearrange, repeat
 from simple_parsing import subgroups
 from simple_parsing.helpers.serialization import save
+from torch import Tensor
 
 from ..extraction import Extract
-from ..metrics import evaluate_preds, get_logprobs, to_one_hot
+from ..metrics import (
+    ENSEMBLING_MODES,
+    evaluate_preds_all_modes,
+    get_logprobs_all_modes,
+    to_one_hot,
+)
 from ..run import Run
 from ..training.supervised import train_supervised
 from ..utils.typing import assert_type
 from .ccs_reporter import CcsConfig, CcsReporter
+from .classifier import save_classifiers
 from .common import FitterConfig
 from .eigen_reporter import EigenFitter, EigenFitterConfig
 
@@ -92,7 +99,8 @@ class Elicit(Run):
 
             reporter = CcsReporter(self.net, d, device=device, num_variants=v)
             train_loss = reporter.fit(first_train_data.hiddens)
-            labels = repeat(to_one_hot(first_train_data.labels, k), "n k -> n v k", v=v)
+            one_hot = to_one_hot(first_train_data.labels, k)
+            labels = one_hot.unsqueeze(1).expand(-1, v, -1)
             reporter.platt_scale(labels, first_train_data.hiddens)
 
         elif isinstance(self.net, EigenFitterConfig):
@@ -100,147 +108,178 @@ class Elicit(Run):
                 self.net, d, num_classes=k, num_variants=v, device=device
             )
 
-            hidden_list, label_list = [], []
+            hiddens_by_v: dict[int, list[Tensor]] = defaultdict(list)
             for ds_name, train_data in train_dict.items():
                 (_, v, _, _) = train_data.hiddens.shape
 
-                # Datasets can have different numbers of variants, so we need to
-                # flatten them here before concatenating
-                hidden_list.append(
-                    rearrange(train_data.hiddens, "n v k d -> (n v k) d")
-                )
-                label_list.append(
-                    to_one_hot(
-                        repeat(train_data.labels, "n -> (n v)", v=v), k
-                    ).flatten()
-                )
-                fitter.update(train_data.hiddens)
+                # With centroids, the streaming updates are equivalent no matter how
+                # the data is batched, so we defer them and update once per group of
+                # datasets with the same number of variants. Without centroids the
+                # running means are normalized by the number of examples rather than
+                # rows, so the batching would change the result.
+                if self.net.use_centroids:
+                    hiddens_by_v[v].append(train_data.hiddens)
+                else:
+                    fitter.update(train_data.hiddens)
+
+            for hiddens in hiddens_by_v.values():
+                fitter.update(hiddens[0] if len(hiddens) == 1 else torch.cat(hiddens))
 
             reporter = fitter.fit_streaming()
-            reporter.platt_scale(
-                torch.cat(label_list),
-                torch.cat(hidden_list),
-            )
+
+            # Datasets can have different numbers of variants, so we need to flatten
+            # them before concatenating. Everything is already on the device, and
+            # with a single dataset the flattened hiddens are just a view.
+            hidden_list = [data.hiddens.flatten(0, 2) for data in train_dict.values()]
+            label_list = [
+                to_one_hot(data.labels.repeat_interleave(data.hiddens.shape[1]), k)
+                .flatten()
+                .float()
+                for data in train_dict.values()
+            ]
+            if len(train_dict) == 1:
+                reporter.platt_scale(label_list[0], hidden_list[0])
+            else:
+                reporter.platt_scale(torch.cat(label_list), torch.cat(hidden_list))
         else:
             raise ValueError(f"Unknown reporter config type: {type(self.net)}")
 
-        # Save reporter checkpoint to disk
-        torch.save(reporter, reporter_dir / f"layer_{layer}.pt")
-
-        # Fit supervised logistic regression model
-        if self.supervised != "none":
-            lr_models = train_supervised(
-                train_dict,
-                device=device,
-                mode=self.supervised,
-            )
-            with open(lr_dir / f"layer_{layer}.pt", "wb") as file:
-                torch.save(lr_models, file)
-        else:
-            lr_models = []
-
-        with torch.no_grad():
-            out_logprobs = defaultdict(dict)
-            row_bufs = defaultdict(list)
-            for ds_name in val_dict:
-                val, train = val_dict[ds_name], train_dict[ds_name]
-                meta = {"dataset": ds_name, "layer": layer}
-
-                if self.save_logprobs:
-                    out_logprobs[ds_name] = dict(
-                        row_ids=val.row_ids.cpu(),
-                        variant_ids=val.variant_ids,
-                        texts=val.texts,
-                        labels=val.labels.cpu(),
-                        lm=dict(),
-                        lr=dict(),
-                        reporter=dict(),
+        # Save checkpoints to disk in the background, so that the writes overlap with
+        # fitting the supervised probes and evaluating. The pool is local because
+        # `Run` objects get pickled and sent to the worker processes.
+        with ThreadPoolExecutor(max_workers=2) as ckpt_pool:
+            ckpt_futures = [
+                ckpt_pool.submit(
+                    reporter.save, reporter_dir / f"layer_{layer}.safetensors"
+                )
+            ]
+
+            # Fit supervised logistic regression model
+            if self.supervised != "none":
+                lr_models = train_supervised(
+                    train_dict,
+                    device=device,
+                    mode=self.supervised,
+                )
+                ckpt_futures.append(
+                    ckpt_pool.submit(
+                        save_classifiers,
+                        lr_models,
+                        lr_dir / f"layer_{layer}.safetensors",
                     )
+                )
+            else:
+                lr_models = []
+
+            with torch.inference_mode():
+                out_logprobs = defaultdict(dict)
+                row_bufs = defaultdict(list)
+                for ds_name in val_dict:
+                    val, train = val_dict[ds_name], train_dict[ds_name]
+                    meta = {"dataset": ds_name, "layer": layer}
 
-                val_credences = reporter(val.hiddens)
-                train_credences = reporter(train.hiddens)
-                for mode in ("none", "partial", "full"):
-                    row_bufs["eval"].append(
-                        {
-                            **meta,
-                            "ensembling": mode,
-                            **evaluate_preds(val.labels, val_credences, mode).to_dict(),
-                            "train_loss": train_loss,
-                        }
-                    )
                     if self.save_logprobs:
-                        out_logprobs[ds_name]["reporter"][mode] = get_logprobs(
-                            val_credences, mode
-                        ).cpu()
-
-                    row_bufs["train_eval"].append(
-                        {
-                            **meta,
-                            "ensembling": mode,
-                            **evaluate_preds(
-                                train.labels, train_credences, mode
-                            ).to_dict(),
-                            "train_loss": train_loss,
-                        }
-                    )
+                        out_logprobs[ds_name] = dict(
+                            row_ids=val.row_ids.cpu(),
+                            variant_ids=val.variant_ids,
+                            texts=val.texts,
+                            labels=val.labels.cpu(),
+                            lm=dict(),
+                            lr={mode: dict() for mode in ENSEMBLING_MODES},
+                            reporter=dict(),
+                        )
 
-                    if val.lm_preds is not None:
-                        row_bufs["lm_eval"].append(
+                    val_credences = reporter(val.hiddens)
+                    train_credences = reporter(train.hiddens)
+                    val_results = evaluate_preds_all_modes(val.labels, val_credences)
+                    train_results = evaluate_preds_all_modes(
+                        train.labels, train_credences
+                    )
+                    for mode in ENSEMBLING_MODES:
+                        row_bufs["eval"].append(
                             {
                                 **meta,
                                 "ensembling": mode,
-                                **evaluate_preds(
-                                    val.labels, val.lm_preds, mode
-                                ).to_dict(),
+                                **val_results[mode].to_dict(),
+                                "train_loss": train_loss,
                             }
                         )
-                        if self.save_logprobs:
-                            out_logprobs[ds_name]["lm"][mode] = get_logprobs(
-                                val.lm_preds, mode
-                            ).cpu()
-
-                    if train.lm_preds is not None:
-                        row_bufs["train_lm_eval"].append(
+                        row_bufs["train_eval"].append(
                             {
                                 **meta,
                                 "ensembling": mode,
-                                **evaluate_preds(
-                                    train.labels, train.lm_preds, mode
-                                ).to_dict(),
+                                **train_results[mode].to_dict(),
+                                "train_loss": train_loss,
                             }
                         )
-
                     if self.save_logprobs:
-                        out_logprobs[ds_name]["lr"][mode] = dict()
+                        out_logprobs[ds_name]["reporter"] = {
+                            mode: logprobs.cpu()
+                            for mode, logprobs in get_logprobs_all_modes(
+                                val_credences
+                            ).items()
+                        }
+
+                    if val.lm_preds is not None:
+                        lm_results = evaluate_preds_all_modes(val.labels, val.lm_preds)
+                        for mode, result in lm_results.items():
+                            row_bufs["lm_eval"].append(
+                                {**meta, "ensembling": mode, **result.to_dict()}
+                            )
+                        if self.save_logprobs:
+                            out_logprobs[ds_name]["lm"] = {
+                                mode: logprobs.cpu()
+                                for mode, logprobs in get_logprobs_all_modes(
+                                    val.lm_preds
+                                ).items()
+                            }
+
+                    if train.lm_preds is not None:
+                        lm_results = evaluate_preds_all_modes(
+                            train.labels, train.lm_preds
+                        )
+                        for mode, result in lm_results.items():
+                            row_bufs["train_lm_eval"].append(
+                                {**meta, "ensembling": mode, **result.to_dict()}
+                            )
 
                     for i, model in enumerate(lr_models):
                         model.eval()
-                        val_credences = model(val.hiddens)
-                        train_credences = model(train.hiddens)
+                        val_lr_credences = model(val.hiddens)
+                        train_lr_credences = model(train.hiddens)
 
                         if self.save_logprobs:
-                            out_logprobs[ds_name]["lr"][mode][i] = get_logprobs(
-                                val_credences, mode
-                            ).cpu()
-                        row_bufs["lr_eval"].append(
-                            {
-                                **meta,
-                                "ensembling": mode,
-                                "inlp_iter": i,
-                                **evaluate_preds(
-                                    val.labels, val_credences, mode
-                                ).to_dict(),
-                            }
+                            for mode, logprobs in get_logprobs_all_modes(
+                                val_lr_credences
+                            ).items():
+                                out_logprobs[ds_name]["lr"][mode][i] = logprobs.cpu()
+
+                        val_results = evaluate_preds_all_modes(
+                            val.labels, val_lr_credences
                         )
-                        row_bufs["train_lr_eval"].append(
-                            {
-                                **meta,
-                                "ensembling": mode,
-                                "inlp_iter": i,
-                                **evaluate_preds(
-                                    train.labels, train_credences, mode
-                                ).to_dict(),
-                            }
+                        train_results = evaluate_preds_all_modes(
+                            train.labels, train_lr_credences
                         )
+                        for mode in ENSEMBLING_MODES:
+                            row_bufs["lr_eval"].append(
+                                {
+                                    **meta,
+                                    "ensembling": mode,
+                                    "inlp_iter": i,
+                                    **val_results[mode].to_dict(),
+                                }
+                            )
+                            row_bufs["train_lr_eval"].append(
+                                {
+                                    **meta,
+                                    "ensembling": mode,
+                                    "inlp_iter": i,
+                                    **train_results[mode].to_dict(),
+                                }
+                            )
+
+            # Surface any errors from the checkpoint writes
+            for future in ckpt_futures:
+                future.result()
 
         return {k: pd.DataFrame(v) for k, v in row_bufs.items()}, out_logprobs
@@ -1,9 +1,12 @@
+import importlib.util
+
 import torch
 import transformers
 from transformers import (
     AutoConfig,
     AutoModel,
     AutoTokenizer,
+    BitsAndBytesConfig,
     PretrainedConfig,
     PreTrainedModel,
     PreTrainedTokenizerBase,
@@ -28,6 +31,7 @@ def instantiate_model(
     """Instantiate a model string with the appropriate `Auto` class."""
     device = torch.device(device)
     kwargs["device_map"] = {"": device}
+    load_in_4bit = kwargs.pop("load_in_4bit", False)
 
     with prevent_name_conflicts():
         model_cfg = AutoConfig.from_pretrained(model_str)
@@ -46,6 +50,22 @@ def instantiate_model(
 
             kwargs["torch_dtype"] = torch.float16
 
+        # NF4 weights are dequantized on the fly, so the non-quantized modules and
+        # the matmuls themselves run in half precision.
+        elif load_in_4bit:
+            if device.type != "cuda":
+                raise ValueError("Can only load in 4-bit on a GPU")
+
+            compute_dtype = (
+                torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            )
+            kwargs["quantization_config"] = BitsAndBytesConfig(
+                load_in_4bit=True,
+                bnb_4bit_quant_type="nf4",
+                bnb_4bit_compute_dtype=compute_dtype,
+            )
+            kwargs["torch_dtype"] = compute_dtype
+
         # CPUs generally don't support anything other than fp32.
         elif device.type == "cpu":
             kwargs["torch_dtype"] = torch.float32
@@ -60,18 +80,57 @@ def instantiate_model(
             kwargs["torch_dtype"] = "auto"
 
         archs = model_cfg.architectures
-        if not isinstance(archs, list):
-            return AutoModel.from_pretrained(model_str, **kwargs)
-
-        for suffix in _AUTOREGRESSIVE_SUFFIXES:
+        model_cls = AutoModel
+        if isinstance(archs, list):
             # Check if any of the architectures in the config end with the suffix.
-            # If so, return the corresponding model class.
-            for arch_str in archs:
-                if arch_str.endswith(suffix):
-                    model_cls = getattr(transformers, arch_str)
-                    return model_cls.from_pretrained(model_str, **kwargs)
-
-        return AutoModel.from_pretrained(model_str, **kwargs)
+            # If so, use the corresponding model class.
+            model_cls = next(
+                (
+                    getattr(transformers, arch_str)
+                    for suffix in _AUTOREGRESSIVE_SUFFIXES
+                    for arch_str in archs
+                    if arch_str.endswith(suffix)
+                ),
+                AutoModel,
+            )
+
+        if "attn_implementation" not in kwargs:
+            dtype = kwargs["torch_dtype"]
+            if dtype == "auto":
+                dtype = model_cfg.torch_dtype
+
+            attn_impl = _fast_attn_implementation(model_cls, device, dtype)
+            if attn_impl is not None:
+                kwargs["attn_implementation"] = attn_impl
+
+        return model_cls.from_pretrained(model_str, **kwargs)
+
+
+def _fast_attn_implementation(
+    model_cls: type, device: torch.device, dtype: torch.dtype | str | None
+) -> str | None:
+    """Pick the fastest attention kernel that `model_cls` supports, if any.
+
+    FlashAttention-2 is used on Ampere or newer GPUs when `flash_attn` is installed
+    and the weights are in half precision; otherwise we fall back to PyTorch's fused
+    SDPA kernel.
+    Returns `None` for models (and `transformers` versions) which support neither.
+    """
+    half_precision = dtype in (torch.float16, torch.bfloat16, "float16", "bfloat16")
+    if (
+        device.type == "cuda"
+        and half_precision
+        # FlashAttention-2 only has kernels for compute capability 8.0 and up
+        and torch.cuda.get_device_capability(device)[0] >= 8
+        and getattr(model_cls, "_supports_flash_attn_2", False)
+        and importlib.util.find_spec("flash_attn") is not None
+    ):
+        return "flash_attention_2"
+
+    if getattr(model_cls, "_supports_sdpa", False):
+        return "sdpa"
+
+    return None
 
 
 def instantiate_tokenizer(model_str: str, **kwargs) -> PreTrainedTokenizerBase:
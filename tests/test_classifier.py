@@ -2,7 +2,7 @@ import torch
 from sklearn.datasets import make_classification
 from sklearn.linear_model import LogisticRegression
 
-from ccs.training.classifier import Classifier
+from ccs.training.classifier import Classifier, load_classifiers, save_classifiers
 
 
 @torch.no_grad()
@@ -41,3 +41,22 @@ def test_classifier_roughly_same_sklearn():
     torch_pred = classifier(new_sample).sigmoid().squeeze()
 
     torch.testing.assert_close(sklearn_pred, torch_pred, atol=1e-2, rtol=1e-2)
+
+
+@torch.no_grad()
+def test_save_load_classifiers(tmp_path):
+    torch.manual_seed(0)
+
+    classifiers = [Classifier(input_dim=10, num_classes=3) for _ in range(2)]
+    for clf in classifiers:
+        clf.linear.weight.data.normal_()
+        clf.linear.bias.data.normal_()
+
+    path = tmp_path / "classifiers.safetensors"
+    save_classifiers(classifiers, path)
+    loaded = load_classifiers(path)
+
+    x = torch.randn(5, 10)
+    assert len(loaded) == len(classifiers)
+    for clf, loaded_clf in zip(classifiers, loaded):
+        torch.testing.assert_close(clf(x), loaded_clf(x))
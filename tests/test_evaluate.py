@@ -0,0 +1,63 @@
+import pytest
+import torch
+from simple_parsing.helpers.serialization import save
+
+from ccs.evaluation.evaluate import load_lr_models, load_reporter
+from ccs.training import (
+    CcsConfig,
+    CcsReporter,
+    Classifier,
+    EigenFitter,
+    EigenFitterConfig,
+)
+
+
+def fit_reporter(cfg, hiddens):
+    if isinstance(cfg, CcsConfig):
+        reporter = CcsReporter(cfg, hiddens.shape[-1], num_variants=hiddens.shape[1])
+        reporter.fit(hiddens)
+        return reporter
+
+    fitter = EigenFitter(cfg, hiddens.shape[-1], num_variants=hiddens.shape[1])
+    fitter.update(hiddens)
+    return fitter.fit_streaming()
+
+
+@pytest.mark.parametrize(
+    "cfg",
+    [
+        CcsConfig(num_tries=1, num_epochs=10),
+        CcsConfig(num_tries=1, num_epochs=10, norm="leace", num_layers=2),
+        CcsConfig(num_tries=1, num_epochs=10, norm="burns", init="spherical"),
+        EigenFitterConfig(),
+    ],
+)
+@pytest.mark.parametrize("legacy", [False, True])
+def test_load_reporter(tmp_path, cfg, legacy: bool):
+    torch.manual_seed(0)
+    hiddens = torch.randn(20, 3, 2, 8)
+    reporter = fit_reporter(cfg, hiddens)
+
+    save(cfg, tmp_path / "cfg.yaml", save_dc_types=True)
+    if legacy:
+        torch.save(reporter, tmp_path / "layer_0.pt")
+    else:
+        reporter.save(tmp_path / "layer_0.safetensors")
+
+    loaded = load_reporter(tmp_path, 0, "cpu")
+    assert type(loaded) is type(reporter)
+    with torch.no_grad():
+        torch.testing.assert_close(loaded(hiddens), reporter(hiddens))
+
+
+def test_load_legacy_lr_models(tmp_path):
+    torch.manual_seed(0)
+    classifier = Classifier(input_dim=8, num_classes=2)
+
+    torch.save([classifier], tmp_path / "layer_0.pt")
+    loaded = load_lr_models(tmp_path, 0, "cpu")
+
+    x = torch.randn(5, 8)
+    assert len(loaded) == 1
+    with torch.no_grad():
+        torch.testing.assert_close(loaded[0](x), classifier(x))
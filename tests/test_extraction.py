@@ -0,0 +1,57 @@
+import pytest
+import torch
+
+from ccs.extraction.extraction import _length_sorted_batches, _pad
+
+
+@pytest.mark.parametrize("max_tokens", [None, 1, 7, 20, 40])
+def test_length_sorted_batches(max_tokens: int | None):
+    lengths = [5, 12, 3, 8, 3, 25, 9, 1, 12, 6]
+    batches = _length_sorted_batches(lengths, max_tokens)
+
+    # Every row shows up exactly once
+    flat = [i for batch in batches for i in batch]
+    assert sorted(flat) == list(range(len(lengths)))
+
+    # Rows come out sorted by length
+    assert [lengths[i] for i in flat] == sorted(lengths)
+
+    if max_tokens is None:
+        assert len(batches) == 1
+        return
+
+    for batch in batches:
+        padded_size = len(batch) * max(lengths[i] for i in batch)
+
+        # Rows which are too long for the budget on their own get their own batch
+        assert padded_size <= max_tokens or len(batch) == 1
+
+
+def test_length_sorted_batches_empty():
+    assert _length_sorted_batches([], 10) == []
+
+
+def test_pad():
+    seqs = [torch.tensor([1, 2, 3]), torch.tensor([4]), torch.tensor([5, 6, 7, 8, 9])]
+    device = torch.device("cpu")
+
+    padded, mask = _pad(seqs, device)
+    assert padded.shape == mask.shape == (3, 5)
+    assert mask.sum(-1).tolist() == [3, 1, 5]
+    for seq, row, row_mask in zip(seqs, padded, mask):
+        assert row[row_mask].tolist() == seq.tolist()
+        assert (row[~row_mask] == 0).all()
+
+    # Round up to a multiple of 8
+    padded, mask = _pad(seqs, device, multiple_of=8)
+    assert padded.shape == mask.shape == (3, 8)
+    assert mask.sum(-1).tolist() == [3, 1, 5]
+
+    # ...but not past max_length
+    padded, _ = _pad(seqs, device, multiple_of=8, max_length=6)
+    assert padded.shape == (3, 6)
+
+    # ...unless the longest sequence is already longer than that
+    padded, mask = _pad(seqs, device, multiple_of=8, max_length=4)
+    assert padded.shape == (3, 5)
+    assert mask.sum(-1).tolist() == [3, 1, 5]
@@ -7,7 +7,15 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import roc_auc_score
 from torch.distributions.normal import Normal
 
-from ccs.metrics import accuracy_ci, roc_auc
+from ccs.metrics import (
+    ENSEMBLING_MODES,
+    accuracy_ci,
+    evaluate_preds,
+    evaluate_preds_all_modes,
+    get_logprobs,
+    get_logprobs_all_modes,
+    roc_auc,
+)
 
 
 def test_auroc_and_acc():
@@ -85,3 +93,17 @@ def test_auroc_and_acc():
     acc_ci = accuracy_ci(y_true_1d_reshaped, hard_preds_reshaped, level=level)
     assert math.isclose(acc_ci.lower, lower, rel_tol=2e-3)
     assert math.isclose(acc_ci.upper, upper, rel_tol=2e-3)
+
+
+def test_all_modes_match_single_mode():
+    rng = torch.Generator().manual_seed(42)
+    y_true = torch.randint(0, 2, (100,), generator=rng)
+    y_logits = torch.randn(100, 5, 2, generator=rng)
+
+    results = evaluate_preds_all_modes(y_true, y_logits)
+    logprobs = get_logprobs_all_modes(y_logits)
+    assert results.keys() == logprobs.keys() == set(ENSEMBLING_MODES)
+
+    for mode in ENSEMBLING_MODES:
+        assert results[mode] == evaluate_preds(y_true, y_logits, mode)
+        torch.testing.assert_close(logprobs[mode], get_logprobs(y_logits, mode))